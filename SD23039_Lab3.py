@@ -1,6 +1,12 @@
+import heapq
 import json
-from typing import List, Dict, Any, Tuple
+import math
+from bisect import bisect_left, bisect_right
+from collections import defaultdict, namedtuple
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 import operator
+import numpy as np
+import pandas as pd
 import streamlit as st
 
 # --- 1. MINIMAL RULE ENGINE LOGIC ---
@@ -15,6 +21,41 @@ OPS = {
     "<=": operator.le,
 }
 
+# Fact fields the UI provides; rules may only refer to these
+KNOWN_FIELDS = {"cgpa", "family_income", "co_curricular score", "disciplinary_actions"}
+
+# How each fact is rounded before evaluation; shared by the form and the batch columns so the
+# same applicant always gets the same decision (works on scalars and NumPy arrays alike)
+FACT_NORMALIZERS = {
+    "cgpa": lambda x: np.round(x, 2),
+    "family_income": np.rint,
+    "co_curricular score": np.trunc,
+    "disciplinary_actions": np.trunc,
+}
+
+# Compiled rule: plain attribute reads instead of repeated dict lookups with defaults
+# - prio: the priority as an int (checked by `validate_rules`, coerced once in `compile_rule`), used as the sort key
+# - compiled: conditions as flat (op_func, field, value) tuples, operator already resolved
+# - fields: the fact fields the conditions refer to
+Rule = namedtuple("Rule", ["name", "prio", "compiled", "action", "conditions", "fields"])
+
+# Inverted condition index: (field, op_func) -> (sorted thresholds, rule positions in the same order)
+ConditionIndex = Dict[Tuple[str, Callable[[Any, Any], bool]], Tuple[List[Any], List[int]]]
+
+# Caches below are shared by every session and keyed on user input (rules text, facts),
+# so they are bounded: a few rule sets, and many more facts combinations per rule set
+RULES_CACHE_ENTRIES = 32
+RUNS_CACHE_ENTRIES = 1024
+
+# Sort key over the compiled integer priority (C-level attrgetter, no lambda)
+PRIORITY_KEY = operator.attrgetter("prio")
+
+# Returned when no rule fires / when the winning rule has no action
+NO_MATCH_ACTION = {"decision": "REJECT", "reason": "No rule criteria matched for an award or review"}
+MISSING_ACTION = {"decision": "REVIEW", "reason": "Matched rule has no defined action"}
+# Returned by the batch path for rows with blank facts, instead of deciding on partial data
+INCOMPLETE_ACTION = {"decision": "INCOMPLETE", "reason": "Missing applicant facts; not evaluated"}
+
 # --- KNOWLEDGE BASE: RULES (EXACTLY as specified in Lab Report 3) ---
 SCHOLARSHIP_RULES: List[Dict[str, Any]] = [
     {
@@ -82,39 +123,264 @@ SCHOLARSHIP_RULES: List[Dict[str, Any]] = [
 ]
 
 
-def evaluate_condition(facts: Dict[str, Any], cond: List[Any]) -> bool:
-    """Evaluate a single condition: [field, op, value]."""
-    if len(cond) != 3:
-        return False
-    field, op, value = cond
-    if field not in facts or op not in OPS:
-        return False
-    try:
-        # Convert values to float for accurate comparison, crucial for CGPA and income
-        return OPS[op](float(facts[field]), float(value))
-    except Exception:
-        return False
+def rule_matches(facts: Dict[str, Any], rule: Rule) -> bool:
+    """All conditions must be true (AND). Uses the (op_func, field, value) tuples built by `compile_rule`."""
+    # Plain loop rather than all(<genexpr>): no generator frame per call
+    for fn, f, v in rule.compiled:
+        if not fn(facts[f], v):
+            return False
+    return True
 
 
-def rule_matches(facts: Dict[str, Any], rule: Dict[str, Any]) -> bool:
-    """All conditions must be true (AND)."""
-    return all(evaluate_condition(facts, c) for c in rule.get("conditions", []))
+def validate_rules(rules: List[Any], known_fields: Set[str]) -> None:
+    """
+    Check the rule schema once at load, so evaluation needs no defensive checks.
+    Raises ValueError naming the offending rule.
+    """
+    for i, rule in enumerate(rules):
+        if not isinstance(rule, dict):
+            raise ValueError(f"Rule #{i + 1} must be a JSON object, got {rule!r}")
+        label = repr(rule["name"]) if "name" in rule else f"#{i + 1}"
+        priority = rule.get("priority", 0)
+        # Any real JSON number is accepted (90.0 is coerced to 90 in `compile_rule`); bool is not a priority
+        if not isinstance(priority, (int, float)) or isinstance(priority, bool):
+            raise ValueError(f"Rule {label}: priority must be a number, got {priority!r}")
+        if isinstance(priority, float) and not math.isfinite(priority):
+            raise ValueError(f"Rule {label}: priority must be a finite number, got {priority!r}")
+        action = rule.get("action", MISSING_ACTION)
+        if not isinstance(action, dict):
+            raise ValueError(f"Rule {label}: action must be a JSON object, got {action!r}")
+        for key in ("decision", "reason"):
+            if not isinstance(action.get(key, ""), str):
+                raise ValueError(f"Rule {label}: action {key} must be a string, got {action[key]!r}")
+        conditions = rule.get("conditions", [])
+        if not isinstance(conditions, list):
+            raise ValueError(f"Rule {label}: conditions must be a list")
+        for cond in conditions:
+            if not isinstance(cond, list) or len(cond) != 3:
+                raise ValueError(f"Rule {label}: condition must be [field, op, value], got {cond}")
+            field, op, value = cond
+            if not isinstance(field, str) or field not in known_fields:
+                raise ValueError(f"Rule {label}: unknown field {field!r} in condition {cond}")
+            if not isinstance(op, str) or op not in OPS:
+                raise ValueError(f"Rule {label}: unknown operator {op!r} in condition {cond}")
+            # NaN/Infinity parse as JSON numbers but compare inconsistently, so reject them here;
+            # true/false would pass float() as 1/0, and huge integers overflow it
+            if isinstance(value, bool):
+                raise ValueError(f"Rule {label}: value must be a number in condition {cond}")
+            try:
+                number = float(value)
+            except (TypeError, ValueError, OverflowError):
+                raise ValueError(f"Rule {label}: value must be a number in condition {cond}") from None
+            if not math.isfinite(number):
+                raise ValueError(f"Rule {label}: value must be a finite number in condition {cond}")
+
+
+def compile_condition(cond: List[Any]) -> Tuple[Callable[[Any, Any], bool], str, float]:
+    """Turn a validated condition [field, op, value] into (op_func, field, value), typing the value once."""
+    field, op, value = cond
+    # JSON numbers are kept as-is (so 80 still displays as 80); anything else is coerced here,
+    # so no evaluation path needs float() or a try/except per call
+    if not isinstance(value, (int, float)):
+        value = float(value)
+    cond[2] = value
+    # Resolve the operator once here instead of an OPS lookup per evaluation
+    return OPS[op], field, value
+
+
+def compile_rule(rule: Dict[str, Any]) -> Rule:
+    """Compile a rule dict (as written in the JSON) into a `Rule`."""
+    conditions = rule.get("conditions", [])
+    compiled = tuple(compile_condition(c) for c in conditions)
+    return Rule(
+        name=rule.get("name", "(unnamed)"),
+        prio=int(rule.get("priority", 0)),
+        compiled=compiled,
+        action=rule.get("action", MISSING_ACTION),
+        conditions=conditions,
+        fields=frozenset(field for _, field, _ in compiled),
+    )
+
+
+def compile_rules(rules: List[Dict[str, Any]]) -> List[Rule]:
+    """Compile every rule dict into a `Rule`."""
+    return [compile_rule(r) for r in rules]
+
+
+@st.cache_data(max_entries=RULES_CACHE_ENTRIES)
+def parse_rules(rules_text: str) -> Tuple[Any, str]:
+    """
+    Returns (rules, error) for the rules JSON text
+    - rules: the parsed JSON array, or None if it is invalid
+    - error: why parsing failed ("" on success), returned rather than raised so it is cached too
+    """
+    try:
+        rules = json.loads(rules_text)
+    except ValueError as e:
+        return None, str(e)
+    if not isinstance(rules, list):
+        return None, "Rules must be a JSON array"
+    return rules, ""
 
 
-def run_rules(facts: Dict[str, Any], rules: List[Dict[str, Any]]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+@st.cache_resource(max_entries=RULES_CACHE_ENTRIES)
+def load_rules(rules_text: str) -> List[Rule]:
+    """
+    Parse and compile the rules JSON; cached so recompilation only happens when the text changes.
+    The rules are returned sorted by descending priority, ready for `run_rules_fast`.
+    """
+    rules, error = parse_rules(rules_text)
+    if error:
+        raise ValueError(error)
+    validate_rules(rules, KNOWN_FIELDS)
+    # FIX APPLIED: Sort by the precomputed int priority to avoid TypeError on mixed types
+    return sorted(compile_rules(rules), key=PRIORITY_KEY, reverse=True)
+
+
+def public_rule(rule: Rule) -> Dict[str, Any]:
+    """Plain dict view of a compiled rule (without the matchers) so it can be shown as JSON."""
+    return {"name": rule.name, "priority": rule.prio, "conditions": rule.conditions, "action": rule.action}
+
+
+@st.cache_data(max_entries=RULES_CACHE_ENTRIES)
+def sorted_rules_json(rules_text: str) -> str:
+    """Pretty-printed JSON of the loaded rules (already sorted by priority), keyed on the rules text."""
+    return json.dumps([public_rule(r) for r in load_rules(rules_text)], indent=2)
+
+
+def build_condition_index(rules: List[Rule]) -> ConditionIndex:
+    """Index every condition by (field, op_func), with thresholds sorted for `bisect`."""
+    buckets = defaultdict(list)
+    for i, r in enumerate(rules):
+        for fn, f, v in r.compiled:
+            buckets[(f, fn)].append((v, i))
+    index = {}
+    for key, entries in buckets.items():
+        entries.sort()
+        index[key] = ([v for v, _ in entries], [i for _, i in entries])
+    return index
+
+
+@st.cache_resource(max_entries=RULES_CACHE_ENTRIES)
+def load_condition_index(rules_text: str) -> ConditionIndex:
+    """`build_condition_index` over `load_rules(rules_text)`, cached alongside the compiled rules."""
+    return build_condition_index(load_rules(rules_text))
+
+
+def pruned_rules(facts: Dict[str, Any], index: ConditionIndex) -> Set[int]:
+    """Positions of the rules with at least one condition already false for these facts."""
+    pruned = set()
+    for (f, fn), (thresholds, ids) in index.items():
+        x = facts[f]
+        # Thresholds in [lo, hi) equal x; the failing ones form a contiguous slice per operator
+        lo = bisect_left(thresholds, x)
+        hi = bisect_right(thresholds, x)
+        if fn is operator.ge:  # x >= t fails for t > x
+            pruned.update(ids[hi:])
+        elif fn is operator.gt:  # x > t fails for t >= x
+            pruned.update(ids[lo:])
+        elif fn is operator.le:  # x <= t fails for t < x
+            pruned.update(ids[:lo])
+        elif fn is operator.lt:  # x < t fails for t <= x
+            pruned.update(ids[:hi])
+        elif fn is operator.eq:
+            pruned.update(ids[:lo])
+            pruned.update(ids[hi:])
+        else:  # operator.ne
+            pruned.update(ids[lo:hi])
+    return pruned
+
+
+def run_rules(facts: Dict[str, Any], rules: List[Rule], index: Optional[ConditionIndex] = None) -> Tuple[Dict[str, Any], List[Rule]]:
     """
     Returns (best_action, fired_rules)
     - best_action: chosen by highest priority among fired rules
-    - fired_rules: list of rule dicts that matched
+    - fired_rules: list of rules that matched, in heap order: fired_rules[0] is the winning rule,
+      the rest are only partially ordered (sort them only when they are displayed)
+    If `index` (from `build_condition_index(rules)`) is given, rules it rules out are skipped.
     """
-    fired = [r for r in rules if rule_matches(facts, r)]
-    if not fired:
-        return ({"decision": "REJECT", "reason": "No rule criteria matched for an award or review"}, [])
+    if index is not None:
+        pruned = pruned_rules(facts, index)
+        rules = [r for i, r in enumerate(rules) if i not in pruned]
+    # Max-heap on priority (ties broken by evaluation order): the best fired rule is always heap[0]
+    heap = []
+    for i, r in enumerate(rules):
+        if rule_matches(facts, r):
+            heapq.heappush(heap, (-r.prio, i, r))
+    if not heap:
+        return (NO_MATCH_ACTION, [])
+
+    return heap[0][2].action, [r for _, _, r in heap]
+
 
-    # Sort in descending order of priority
-    fired_sorted = sorted(fired, key=lambda r: r.get("priority", 0), reverse=True)
-    best = fired_sorted[0].get("action", {"decision": "REVIEW", "reason": "Matched rule has no defined action"})
-    return best, fired_sorted
+def run_rules_fast(facts: Dict[str, Any], rules_by_prio: List[Rule]) -> Tuple[Dict[str, Any], List[Rule]]:
+    """
+    Same (best_action, fired_rules) contract as `run_rules`, but expects rules sorted by
+    descending priority and stops at the first match, so fired_rules holds only the winner.
+    """
+    for r in rules_by_prio:
+        if rule_matches(facts, r):
+            return r.action, [r]
+    return (NO_MATCH_ACTION, [])
+
+
+@st.cache_data(max_entries=RUNS_CACHE_ENTRIES)
+def cached_run_rules(facts_key: Tuple[Tuple[str, Any], ...], rules_text: str, show_all: bool = False) -> Tuple[Dict[str, Any], List[int]]:
+    """
+    Memoized `run_rules` (or `run_rules_fast` unless show_all) keyed on the frozen facts and the
+    rules text, so reruns that don't change either skip the engine entirely.
+    Returns (best_action, fired_indices); the indices point into `load_rules(rules_text)`
+    because the compiled rules themselves can't be pickled into the cache.
+    """
+    rules = load_rules(rules_text)
+    if show_all:
+        action, fired = run_rules(dict(facts_key), rules, load_condition_index(rules_text))
+    else:
+        action, fired = run_rules_fast(dict(facts_key), rules)
+    position = {id(r): i for i, r in enumerate(rules)}
+    return action, [position[id(r)] for r in fired]
+
+
+def run_rules_batch(facts_df: Any, rules: List[Rule]) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+    """
+    Vectorized `run_rules` for many applicants at once.
+    - facts_df: DataFrame (or mapping of field -> column) with one row per applicant
+    - rules: sorted by descending priority (as returned by `load_rules`)
+    Returns (best_actions, best_rule_index)
+    - best_actions: one action per applicant, chosen by highest priority among fired rules;
+      rows with a blank value in any field the rules use get INCOMPLETE_ACTION instead
+    - best_rule_index: index into `rules` of the winning rule per applicant, -1 if none fired
+    Raises ValueError if a column the rules use is missing from facts_df.
+    """
+    fields = set().union(*(r.fields for r in rules))
+    missing = sorted(fields - set(facts_df))
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    # Same rounding as the form applies to `facts`
+    columns = {field: FACT_NORMALIZERS[field](np.asarray(facts_df[field], dtype=float)) for field in fields}
+    n_rows = len(facts_df)
+    incomplete = np.zeros(n_rows, dtype=bool)
+    for column in columns.values():
+        incomplete |= np.isnan(column)
+
+    # (n_applicants, n_rules) match matrix
+    matched = np.zeros((n_rows, len(rules)), dtype=bool)
+    for j, r in enumerate(rules):
+        # The operator functions broadcast over whole NumPy columns
+        mask = ~incomplete
+        for fn, f, v in r.compiled:
+            mask &= fn(columns[f], v)
+        matched[:, j] = mask
+
+    # Rules are priority-sorted (stably), so the first True per row is the best fired rule
+    best_idx = matched.argmax(axis=1) if rules else np.zeros(n_rows, dtype=np.int64)
+    best_idx[~matched.any(axis=1)] = -1
+
+    best_actions = [
+        INCOMPLETE_ACTION if skip else rules[j].action if j >= 0 else NO_MATCH_ACTION
+        for j, skip in zip(best_idx, incomplete)
+    ]
+    return best_actions, best_idx
 
 
 # --- Helper function for clean output ---
@@ -127,6 +393,15 @@ def display_simple_conditions(conditions: List[List[Any]]):
         st.markdown(f"* `{field}` **{op}** `{value}`")
 
 
+@st.cache_resource
+def _default_rules_json() -> str:
+    """The built-in rules as pretty JSON, computed once per process."""
+    return json.dumps(SCHOLARSHIP_RULES, indent=2)
+
+
+DEFAULT_RULES_JSON = _default_rules_json()
+
+
 # ----------------------------
 # 2) STREAMLIT UI
 # ----------------------------
@@ -151,52 +426,62 @@ with st.sidebar:
     st.divider()
     st.header("Rules Configuration")
     st.caption("The system runs on the mandated rule set from the lab case study.")
-    default_json = json.dumps(SCHOLARSHIP_RULES, indent=2)
-    rules_text = st.text_area("Edit rules here (Optional)", value=default_json, height=300)
+    rules_text = st.text_area("Edit rules here (Optional)", value=DEFAULT_RULES_JSON, height=300)
 
     run = st.button("Evaluate Eligibility", type="primary")
 
 # --- FACTS DICTIONARY (Input for the engine) ---
 
 # FIX APPLIED: Explicitly round float inputs to prevent excessive decimal places in display.
-rounded_cgpa = round(float(cgpa), 2)
-rounded_family_income = round(float(family_income))
+rounded_cgpa = float(FACT_NORMALIZERS["cgpa"](float(cgpa)))
+rounded_family_income = int(FACT_NORMALIZERS["family_income"](float(family_income)))
 
 facts = {
     # Key names MUST match the field names in the rules precisely
     "cgpa": rounded_cgpa,
     "family_income": rounded_family_income,
-    "co_curricular score": int(co_curricular_score),
-    "disciplinary_actions": int(disciplinary_actions),
+    "co_curricular score": int(FACT_NORMALIZERS["co_curricular score"](co_curricular_score)),
+    "disciplinary_actions": int(FACT_NORMALIZERS["disciplinary_actions"](disciplinary_actions)),
 }
 
 # Display Applicant Facts in the main pane
 st.subheader("Applicant Facts for Evaluation")
 st.json(facts)
 
+# Keep the last evaluation on screen across reruns triggered by the expanders below,
+# but drop it as soon as the facts or rules change (same as clicking the button again)
+evaluation_key = (tuple(facts.items()), rules_text)
+if run:
+    st.session_state.evaluated = evaluation_key
+evaluated = st.session_state.get("evaluated") == evaluation_key
+
 # --- RULE LOADING ---
-try:
-    rules = json.loads(rules_text)
-    assert isinstance(rules, list), "Rules must be a JSON array"
-except Exception as e:
-    st.error(f"Invalid rules JSON. Using defaults. Details: {e}")
-    rules = SCHOLARSHIP_RULES
+# Only parse the rules when something consumes them: an evaluation, the rules view or a batch upload
+rules: List[Rule] = []
+if evaluated or st.session_state.get("show_all_rules") or st.session_state.get("batch_file") is not None:
+    try:
+        rules = load_rules(rules_text)
+    except Exception as e:
+        st.error(f"Invalid rules JSON. Using defaults. Details: {e}")
+        rules_text = DEFAULT_RULES_JSON
+        rules = load_rules(rules_text)
 
 st.subheader("Active Knowledge Base")
 
-# FIX APPLIED: Sort the list explicitly BEFORE using json.dumps() to avoid TypeError
-sorted_rules_for_display = sorted(rules, key=lambda r: r.get('priority', 0), reverse=True)
-
-with st.expander("Show all rules (Sorted by Priority)", expanded=False):
-    # Use the pre-sorted list and ONLY include the 'indent' argument
-    st.code(json.dumps(sorted_rules_for_display, indent=2), language="json")
+# A state-tracking expander (on_change="rerun") exposes .open, so the dump only runs while it is open
+with st.expander("Show all rules (Sorted by Priority)", expanded=False, key="show_all_rules", on_change="rerun") as all_rules:
+    if all_rules.open:
+        st.code(sorted_rules_json(rules_text), language="json")
 
 st.divider()
 
 # --- EVALUATION AND RESULTS ---
-if run:
-    # Use the rules array (unedited or edited) for evaluation
-    action, fired = run_rules(facts, rules)
+if evaluated:
+    # Use the rules array (unedited or edited) for evaluation; the full scan over every
+    # rule is only needed while the matched-rules list is shown
+    show_matched = st.session_state.get("show_matched_rules", False)
+    action, fired_idx = cached_run_rules(tuple(sorted(facts.items())), rules_text, show_matched)
+    fired = [rules[i] for i in fired_idx]
 
     col1, col2 = st.columns([1, 1])
     with col1:
@@ -220,21 +505,46 @@ if run:
             st.info("No defined scholarship rule criteria were matched.")
         else:
             # Display the best match
-            best_match_name = fired[0].get('name', '(unnamed)')
-            best_match_priority = fired[0].get('priority', 0)
+            best_match_name = fired[0].name
+            best_match_priority = fired[0].prio
             st.markdown(f"**Best Match**: **{best_match_name}** | Priority: {best_match_priority}")
             st.caption(f"Chosen Action: {action.get('decision', '-')}")
 
             # Display all matched rules in detail using the cleaner format
-            with st.expander("Show All Matched Rules and Details"):
-                for i, r in enumerate(fired):
-                    st.markdown(f"---")
-                    st.write(f"**{i + 1}. {r.get('name', '(unnamed)')}** | Priority={r.get('priority', 0)}")
-                    st.caption(f"Action: {r.get('action', {})}")
-
-                    # Call the helper function to display conditions cleanly
-                    display_simple_conditions(r.get('conditions', []))
+            with st.expander("Show All Matched Rules and Details", key="show_matched_rules", on_change="rerun") as matched_rules:
+                # Only sort and render the full list while the expander is open; indices into the
+                # priority-sorted rules keep ties in rule order
+                if matched_rules.open:
+                    fired_sorted = [rules[i] for i in sorted(fired_idx)]
+                    for i, r in enumerate(fired_sorted):
+                        st.markdown(f"---")
+                        st.write(f"**{i + 1}. {r.name}** | Priority={r.prio}")
+                        st.caption(f"Action: {r.action}")
+
+                        # Call the helper function to display conditions cleanly
+                        display_simple_conditions(r.conditions)
 
 else:
 
     st.info("Set applicant details in the sidebar and click **Evaluate Eligibility** to run the advisory system.")
+
+# --- BATCH EVALUATION ---
+st.divider()
+st.subheader("Batch Evaluation")
+batch_file = st.file_uploader(
+    "Upload a CSV of applicants (columns: cgpa, family_income, co_curricular score, disciplinary_actions)",
+    type="csv",
+    key="batch_file",
+)
+if batch_file is not None:
+    try:
+        applicants = pd.read_csv(batch_file)
+        batch_actions, batch_idx = run_rules_batch(applicants, rules)
+    except Exception as e:
+        st.error(f"Could not evaluate the uploaded CSV. Details: {e}")
+    else:
+        results = applicants.copy()
+        results["decision"] = [a.get("decision", "REVIEW") for a in batch_actions]
+        results["reason"] = [a.get("reason", "-") for a in batch_actions]
+        results["best_match"] = [rules[j].name if j >= 0 else "-" for j in batch_idx]
+        st.dataframe(results, use_container_width=True)
@@ -0,0 +1,200 @@
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "SD23039_Lab3.py")
+
+
+def _index_matches_full_scan(app_path):
+    """Runs inside AppTest: compare `run_rules` with and without the condition index."""
+    import json
+    import random
+    import runpy
+
+    import streamlit as st
+
+    ns = runpy.run_path(app_path)
+    mismatches = []
+
+    def check(rules, facts):
+        index = ns["build_condition_index"](rules)
+        action, fired = ns["run_rules"](facts, rules)
+        indexed_action, indexed_fired = ns["run_rules"](facts, rules, index)
+        if (action, fired) != (indexed_action, indexed_fired):
+            mismatches.append((facts, action, indexed_action))
+
+    # Randomized rule sets over every operator, loaded through the normal validation path
+    rng = random.Random(0)
+    fields = sorted(ns["KNOWN_FIELDS"])
+    for _ in range(200):
+        raw = [
+            {
+                "name": f"r{i}",
+                "priority": rng.randint(0, 5),
+                "conditions": [[rng.choice(fields), rng.choice(list(ns["OPS"])), rng.randint(0, 4)]
+                               for _ in range(rng.randint(0, 3))],
+            }
+            for i in range(rng.randint(1, 8))
+        ]
+        rules = ns["load_rules"](json.dumps(raw))
+        for _ in range(10):
+            check(rules, {f: rng.choice([0, 1, 2, 2.5, 3, 4]) for f in fields})
+
+    st.session_state["mismatches"] = mismatches
+
+
+def _load_error(app_path, rules_text):
+    """Runs inside AppTest: the error `load_rules` raises for `rules_text`, or "" if it loads."""
+    import runpy
+
+    import streamlit as st
+
+    ns = runpy.run_path(app_path)
+    try:
+        ns["load_rules"](rules_text)
+        st.session_state["error"] = ""
+    except ValueError as e:
+        st.session_state["error"] = str(e)
+
+
+def _winners_agree(app_path):
+    """Runs inside AppTest: `run_rules` (with and without the index) and `run_rules_fast` pick the same rule."""
+    import json
+    import random
+    import runpy
+
+    import streamlit as st
+
+    ns = runpy.run_path(app_path)
+    mismatches = []
+
+    def check(rules, facts):
+        expected = next((r for r in rules if ns["rule_matches"](facts, r)), None)
+        winners = [
+            fired[0] if fired else None
+            for _, fired in (
+                ns["run_rules"](facts, rules),
+                ns["run_rules"](facts, rules, ns["build_condition_index"](rules)),
+                ns["run_rules_fast"](facts, rules),
+            )
+        ]
+        if any(w is not expected for w in winners):
+            mismatches.append((facts, expected, winners))
+
+    # Equal priorities: the rule listed first wins
+    ties = ns["load_rules"](json.dumps([
+        {"name": "low", "priority": 1, "conditions": [], "action": {"decision": "REJECT"}},
+        {"name": "first", "priority": 5, "conditions": [["cgpa", ">=", 2]], "action": {"decision": "AWARD FULL"}},
+        {"name": "second", "priority": 5, "conditions": [["cgpa", ">=", 1]], "action": {"decision": "REVIEW"}},
+    ]))
+    st.session_state["tie_winners"] = [
+        ns["run_rules"]({"cgpa": cgpa}, ties)[1][0].name for cgpa in (0, 1, 2)
+    ]
+    for cgpa in (0, 1, 2):
+        check(ties, {"cgpa": cgpa})
+
+    # Randomized rule sets with many priority ties
+    rng = random.Random(1)
+    fields = sorted(ns["KNOWN_FIELDS"])
+    for _ in range(200):
+        raw = [
+            {
+                "name": f"r{i}",
+                "priority": rng.randint(0, 2),
+                "conditions": [[rng.choice(fields), rng.choice(list(ns["OPS"])), rng.randint(0, 4)]
+                               for _ in range(rng.randint(0, 3))],
+            }
+            for i in range(rng.randint(1, 8))
+        ]
+        rules = ns["load_rules"](json.dumps(raw))
+        for _ in range(10):
+            check(rules, {f: rng.choice([0, 1, 2, 2.5, 3, 4]) for f in fields})
+
+    st.session_state["mismatches"] = mismatches
+
+
+def _batch_matches_form(app_path):
+    """Runs inside AppTest: compare `run_rules_batch` with `run_rules` on form-normalized facts."""
+    import runpy
+
+    import numpy as np
+    import pandas as pd
+    import streamlit as st
+
+    ns = runpy.run_path(app_path)
+    rules = ns["load_rules"](ns["DEFAULT_RULES_JSON"])
+    applicants = pd.DataFrame({
+        "cgpa": [3.695, 3.8, 2.4, 3.35, 2.6],
+        "family_income": [7999.6, np.nan, 3000, 11999.4, 3999.5],
+        "co_curricular score": [80, 90, 50, 60.9, 10],
+        "disciplinary_actions": [0, 0, 3, 1, 0],
+    })
+    actions, _ = ns["run_rules_batch"](applicants, rules)
+
+    expected = []
+    for row in applicants.to_dict("records"):
+        if any(v != v for v in row.values()):
+            expected.append(ns["INCOMPLETE_ACTION"])
+            continue
+        facts = {f: float(ns["FACT_NORMALIZERS"][f](v)) for f, v in row.items()}
+        expected.append(ns["run_rules"](facts, rules)[0])
+    st.session_state["batch"] = [a["decision"] for a in actions]
+    st.session_state["form"] = [a["decision"] for a in expected]
+
+
+def test_condition_index_matches_full_scan():
+    at = AppTest.from_function(_index_matches_full_scan, args=(APP_PATH,), default_timeout=60).run()
+    assert not at.exception
+    assert at.session_state["mismatches"] == []
+
+
+def test_non_finite_threshold_rejected_at_load():
+    rules_text = '[{"name": "N", "priority": 30, "conditions": [["cgpa", "<=", NaN]]}]'
+    at = AppTest.from_function(_load_error, args=(APP_PATH, rules_text), default_timeout=60).run()
+    assert not at.exception
+    assert "finite" in at.session_state["error"]
+
+
+@pytest.mark.parametrize(
+    "rules_text, message",
+    [
+        ('["not a rule"]', "must be a JSON object"),
+        ('[{"name": "P", "priority": "high"}]', "priority must be a number"),
+        ('[{"name": "P", "priority": true}]', "priority must be a number"),
+        ('[{"name": "A", "action": "oops"}]', "action must be a JSON object"),
+        ('[{"name": "D", "action": {"decision": 5}}]', "action decision must be a string"),
+        ('[{"name": "C", "conditions": "x"}]', "conditions must be a list"),
+        ('[{"name": "C", "conditions": [["cgpa", ">="]]}]', "condition must be [field, op, value]"),
+        ('[{"name": "F", "conditions": [["gpa", ">=", 3]]}]', "unknown field"),
+        ('[{"name": "O", "conditions": [["cgpa", "=>", 3]]}]', "unknown operator"),
+        ('[{"name": "V", "conditions": [["cgpa", ">=", "high"]]}]', "value must be a number"),
+        ('[{"name": "V", "conditions": [["cgpa", "==", true]]}]', "value must be a number"),
+        ('[{"name": "V", "conditions": [["cgpa", ">=", 1' + "0" * 400 + ']]}]', "value must be a number"),
+    ],
+)
+def test_invalid_rules_rejected_at_load(rules_text, message):
+    at = AppTest.from_function(_load_error, args=(APP_PATH, rules_text), default_timeout=60).run()
+    assert not at.exception
+    assert message in at.session_state["error"]
+
+
+def test_real_number_priority_loads():
+    rules_text = '[{"name": "P", "priority": 90.0, "conditions": [["cgpa", ">=", 3.5]]}]'
+    at = AppTest.from_function(_load_error, args=(APP_PATH, rules_text), default_timeout=60).run()
+    assert not at.exception
+    assert at.session_state["error"] == ""
+
+
+def test_fast_and_heap_pick_the_same_winner():
+    at = AppTest.from_function(_winners_agree, args=(APP_PATH,), default_timeout=60).run()
+    assert not at.exception
+    assert at.session_state["tie_winners"] == ["low", "second", "first"]
+    assert at.session_state["mismatches"] == []
+
+
+def test_batch_matches_form_and_flags_blank_cells():
+    at = AppTest.from_function(_batch_matches_form, args=(APP_PATH,), default_timeout=60).run()
+    assert not at.exception
+    assert at.session_state["batch"] == at.session_state["form"]
+    assert at.session_state["batch"][:2] == ["AWARD FULL", "INCOMPLETE"]